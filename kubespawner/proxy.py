@@ -2,18 +2,91 @@ import asyncio
 import json
 import os
 import string
+from functools import lru_cache, wraps
 
 import escapism
 from jupyterhub.proxy import Proxy
-from jupyterhub.utils import exponential_backoff
 from kubernetes_asyncio import client
-from traitlets import Bool, Dict, List, Unicode
+from traitlets import Bool, Dict, List, Unicode, default
 
 from .clients import load_config, shared_client
 from .objects import make_ingress
 from .reflector import ResourceReflector
 from .slugs import escape_slug
-from .utils import generate_hashed_slug
+from .utils import generate_hashed_slug, is_subset, json_loads
+
+# annotations of the ingresses created by make_ingress, from which get_all_routes
+# reads the routes back
+_routespec_annotation = 'hub.jupyter.org/proxy-routespec'
+_target_annotation = 'hub.jupyter.org/proxy-target'
+_data_annotation = 'hub.jupyter.org/proxy-data'
+
+# fieldManager and content type of the server-side applies made by
+# KubeIngressProxy, see _ensure_object
+_field_manager = 'kubespawner'
+_apply_content_type = 'application/apply-patch+yaml; charset=utf-8'
+
+# Note: '-' is not in safe_chars, as it is being used as escape character
+_routespec_safe_chars = set(string.ascii_lowercase + string.digits)
+
+# str.translate table doing what escapism.escape does with the arguments used in
+# _escape_routespec for ASCII characters, but in C rather than per character in
+# Python. Like escapism, it uses uppercase hex without zero padding.
+_routespec_escape_table = {
+    i: f'-{i:X}' for i in range(128) if chr(i) not in _routespec_safe_chars
+}
+
+
+def _escape_routespec(routespec):
+    if routespec.isascii():
+        return routespec.translate(_routespec_escape_table)
+    return escapism.escape(routespec, safe=_routespec_safe_chars, escape_char='-')
+
+
+@lru_cache(maxsize=4096)
+def _safe_name_for_routespec(routespec):
+    # FIXME: escape_slug isn't exactly as whats done here, because we aren't
+    #        calling .lower(), it may have been fine to just transition to
+    #        escape_slug though, but its wasn't obvious a safe change so it
+    #        wasn't done.
+    #
+    # NOTE: escapism escapes with uppercase hex (e.g. '/' becomes '-2F'), so
+    #       the returned name isn't necessarily lowercase. Callers using it as
+    #       a k8s object name must call .lower() on it, while template
+    #       expansion of {routespec} has always used it as is.
+    return generate_hashed_slug('jupyter-' + _escape_routespec(routespec) + '-route')
+
+
+def _drop_empty(obj):
+    """
+    Returns the serialized k8s object obj without fields set to an empty string,
+    as those are omitted by the api-server when returning objects.
+    """
+    if isinstance(obj, dict):
+        return {k: _drop_empty(v) for k, v in obj.items() if v != ''}
+    elif isinstance(obj, list):
+        return [_drop_empty(i) for i in obj]
+    else:
+        return obj
+
+
+def _await_reflectors_ready(method):
+    """
+    Decorates KubeIngressProxy methods that rely on the reflectors having
+    completed their first load.
+
+    The reflectors are started on the first call, and once loaded, this only
+    costs a check of a boolean attribute.
+    """
+
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if not self._reflectors_loaded:
+            await self._ensure_reflectors_started()
+            self._reflectors_loaded = True
+        return await method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class IngressReflector(ResourceReflector):
@@ -140,6 +213,7 @@ class KubeIngressProxy(Proxy):
         """,
     )
 
+    @default('namespace')
     def _namespace_default(self):
         """
         Set namespace default to current namespace if running in a k8s cluster
@@ -319,14 +393,45 @@ class KubeIngressProxy(Proxy):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # load_config is lru_cache'd, so the kubeconfig or service account
+        # files are only read once per process for a given combination of
+        # arguments, no matter how many proxy or spawner instances call it.
         load_config(
             host=self.k8s_api_host,
             ssl_ca_cert=self.k8s_api_ssl_ca_cert,
             verify_ssl=self.k8s_api_verify_ssl,
         )
+        # The reflectors created below call shared_client with their
+        # api_group_name as well, so they reuse these same client instances and
+        # their connection pools rather than creating their own.
         self.core_api = shared_client('CoreV1Api')
         self.networking_api = shared_client('NetworkingV1Api')
 
+        # the namespace the hub runs in, for the {hubnamespace} template field,
+        # is read once here instead of from the filesystem for every route
+        self._hub_namespace = self._namespace_default()
+        if self._hub_namespace == "default":
+            self._hub_namespace = "user"
+
+        # trait name -> (trait value, prerendered value), see _prerendered
+        self._prerendered_cache = {}
+
+        # Used for all deletions, they are only read when serialized. Background
+        # instead of foreground cascading deletion is used when deleting an
+        # ingress, as the latter would keep the ingress around until its
+        # dependents are gone, and an add_route for the same routespec in the
+        # meantime would patch an ingress about to be deleted.
+        self._delete_options = client.V1DeleteOptions(
+            grace_period_seconds=0, propagation_policy='Background'
+        )
+
+        # ingress key -> (resourceVersion, route), see get_all_routes
+        self._route_cache = {}
+        # the routes last returned by get_all_routes, and the ingress
+        # reflector's generation they were built from
+        self._routes = {}
+        self._routes_generation = None
+
         labels = {
             # NOTE: We monitor resources with the old component label instead of
             #       the modern app.kubernetes.io/component label. A change here
@@ -341,6 +446,12 @@ class KubeIngressProxy(Proxy):
             'component': self.component_label,
             'hub.jupyter.org/proxy-route': 'true',
         }
+        # labels set on all created objects in addition to common_labels
+        self._component_labels = {
+            'app.kubernetes.io/component': self.component_label,
+            'component': self.component_label,
+        }
+
         self.ingress_reflector = IngressReflector(
             parent=self, namespace=self.namespace, labels=labels
         )
@@ -351,36 +462,67 @@ class KubeIngressProxy(Proxy):
             parent=self, namespace=self.namespace, labels=labels
         )
 
-        # schedule our reflectors to start in the event loop,
-        # reflectors first load can be awaited with:
-        #
-        #   await some_reflector._first_load_future
-        #
-        asyncio.ensure_future(self.ingress_reflector.start())
-        asyncio.ensure_future(self.service_reflector.start())
-        asyncio.ensure_future(self.endpoint_reflector.start())
+        # kind -> (apiVersion, patch function, reflector) for the objects
+        # created by add_route, see _ensure_object
+        self._route_ops = {
+            'endpoints': (
+                'v1',
+                self.core_api.patch_namespaced_endpoints,
+                self.endpoint_reflector,
+            ),
+            'service': (
+                'v1',
+                self.core_api.patch_namespaced_service,
+                self.service_reflector,
+            ),
+            'ingress': (
+                'networking.k8s.io/v1',
+                self.networking_api.patch_namespaced_ingress,
+                self.ingress_reflector,
+            ),
+        }
+
+        # the reflectors are started lazily by _ensure_reflectors_started, so
+        # that creating a proxy instance that is never used doesn't start
+        # three LIST+WATCH loops
+        self._reflector_start_tasks = []
+        self._reflectors_ready = None
+        self._reflectors_loaded = False
+
+    async def _ensure_reflectors_started(self):
+        """
+        Start the reflectors if not already started, and wait for all their
+        first loads to complete.
+        """
+        if self._reflectors_ready is None:
+            reflectors = [
+                self.ingress_reflector,
+                self.service_reflector,
+                self.endpoint_reflector,
+            ]
+            # the start tasks are referenced so they aren't garbage collected
+            # before they are done, as the event loop only keeps weak references
+            self._reflector_start_tasks = [
+                asyncio.ensure_future(r.start()) for r in reflectors
+            ]
+            self._reflectors_ready = asyncio.gather(
+                *(r.first_load_future for r in reflectors)
+            )
+        await self._reflectors_ready
 
     def _safe_name_for_routespec(self, routespec):
-        # FIXME: escape_slug isn't exactly as whats done here, because we aren't
-        #        calling .lower(), it may have been fine to just transition to
-        #        escape_slug though, but its wasn't obvious a safe change so it
-        #        wasn't done.
-        safe_chars = set(string.ascii_lowercase + string.digits)
-        safe_name = generate_hashed_slug(
-            'jupyter-'
-            + escapism.escape(routespec, safe=safe_chars, escape_char='-')
-            + '-route'
-        )
-        return safe_name
+        # the mapping is deterministic and called for every route operation and
+        # template expansion, so it is cached at module level
+        return _safe_name_for_routespec(routespec)
 
-    def _expand_user_properties(self, template, routespec, data):
+    def _template_values(self, routespec, data):
+        """
+        Returns the values available to templates in the configuration of a
+        route, to be computed once per route and passed to _expand_all.
+        """
         raw_servername = data.get('server_name') or ''
         safe_servername = escape_slug(raw_servername)
 
-        hub_namespace = self._namespace_default()
-        if hub_namespace == "default":
-            hub_namespace = "user"
-
         raw_username = data.get('user') or ''
         safe_username = escape_slug(raw_username)
 
@@ -390,7 +532,7 @@ class KubeIngressProxy(Proxy):
         raw_routespec = routespec
         safe_routespec = self._safe_name_for_routespec(routespec)
 
-        rendered = template.format(
+        return dict(
             username=safe_username,
             unescaped_username=raw_username,
             servername=safe_servername,
@@ -399,22 +541,75 @@ class KubeIngressProxy(Proxy):
             unescaped_servicename=raw_servicename,
             routespec=safe_routespec,
             unescaped_routespec=raw_routespec,
-            hubnamespace=hub_namespace,
+            hubnamespace=self._hub_namespace,
         )
+
+    def _expand_user_properties(self, template, values):
+        if '{' in template or '}' in template:
+            rendered = template.format_map(values)
+        else:
+            # most configured strings have no fields, skip formatting them
+            rendered = template
         # strip trailing - delimiter in case of empty servername.
         # k8s object names cannot have trailing -
         return rendered.rstrip("-")
 
-    def _expand_all(self, src, routespec, data):
+    def _expand_all(self, src, values):
         if isinstance(src, list):
-            return [self._expand_all(i, routespec, data) for i in src]
+            return [self._expand_all(i, values) for i in src]
         elif isinstance(src, dict):
-            return {k: self._expand_all(v, routespec, data) for k, v in src.items()}
+            return {k: self._expand_all(v, values) for k, v in src.items()}
         elif isinstance(src, str):
-            return self._expand_user_properties(src, routespec, data)
+            return self._expand_user_properties(src, values)
         else:
             return src
 
+    def _prerender(self, src):
+        """
+        Returns src with the {hubnamespace} fields of its template strings
+        already substituted, as it is the same for every route. Other fields are
+        left as they are to be expanded per route by _expand_all.
+        """
+        if isinstance(src, list):
+            return [self._prerender(i) for i in src]
+        elif isinstance(src, dict):
+            return {k: self._prerender(v) for k, v in src.items()}
+        elif isinstance(src, str) and '{' in src:
+            try:
+                parsed = list(string.Formatter().parse(src))
+            except ValueError:
+                # leave it to _expand_user_properties to raise
+                return src
+            parts = []
+            for literal, field_name, format_spec, conversion in parsed:
+                parts.append(literal.replace('{', '{{').replace('}', '}}'))
+                if field_name is None:
+                    continue
+                if field_name == 'hubnamespace' and not format_spec and not conversion:
+                    parts.append(self._hub_namespace)
+                    continue
+                field = field_name
+                if conversion:
+                    field += '!' + conversion
+                if format_spec:
+                    field += ':' + format_spec
+                parts.append('{' + field + '}')
+            return ''.join(parts)
+        else:
+            return src
+
+    def _prerendered(self, name):
+        """
+        Returns the value of the trait name passed through _prerender, which is
+        only redone if the trait has been assigned a new value.
+        """
+        value = getattr(self, name)
+        cached = self._prerendered_cache.get(name)
+        if cached is None or cached[0] is not value:
+            cached = (value, self._prerender(value))
+            self._prerendered_cache[name] = cached
+        return cached[1]
+
     async def _delete_if_exists(self, kind, safe_name, future):
         try:
             await future
@@ -424,6 +619,87 @@ class KubeIngressProxy(Proxy):
                 raise
             self.log.warn("Could not delete %s/%s: does not exist", kind, safe_name)
 
+    def _is_up_to_date(self, resource, body):
+        """
+        Check if a reflected resource already has the labels, annotations,
+        owner references, and specification of the k8s model object body.
+
+        Fields only present in the reflected resource, such as those defaulted
+        by the api-server, are ignored, like a patch would leave them be. Fields
+        of body set to an empty string, such as the clusterIP or externalName
+        set by make_ingress, are ignored as well, as the api-server omits them.
+        """
+        desired = _drop_empty(
+            self.core_api.api_client.sanitize_for_serialization(body)
+        )
+        desired.pop('apiVersion', None)
+        desired.pop('kind', None)
+        desired['metadata'] = {
+            k: v
+            for k, v in desired['metadata'].items()
+            if k in ('labels', 'annotations', 'ownerReferences')
+        }
+        return is_subset(desired, resource)
+
+    async def _ensure_object(self, kind, body, skip_up_to_date=True):
+        """
+        Create or update a k8s object of the given kind in self._route_ops with
+        a server-side apply, unless skip_up_to_date is set and it is reflected
+        and already up-to-date.
+
+        A server-side apply creates the object if it doesn't exist and updates
+        it otherwise, so this is at most one request whether or not the object
+        exists.
+
+        Returns the uid of the object.
+        """
+        api_version, patch_func, reflector = self._route_ops[kind]
+        name = body.metadata.name
+        if skip_up_to_date:
+            resource = reflector.resources.get(f'{self.namespace}/{name}')
+            if resource is not None and self._is_up_to_date(resource, body):
+                self.log.debug(
+                    "Not applying %s/%s, it is already up-to-date", kind, name
+                )
+                return resource['metadata']['uid']
+
+        # apply requests must specify apiVersion and kind
+        body.api_version = api_version
+        # The body is sent serialized as JSON, which is valid YAML, because
+        # kubernetes_asyncio versions before 25.11.0, and 30.1.x, can't
+        # serialize bodies for the apply content type and only send bytes.
+        # Other versions serialize bodies for it, bytes included, but only if
+        # the content type has no parameters. With the charset parameter,
+        # which the api-server strips from patch content types, all versions
+        # send the bytes as they are.
+        applied = await patch_func(
+            namespace=self.namespace,
+            name=name,
+            body=json.dumps(
+                self.core_api.api_client.sanitize_for_serialization(body)
+            ).encode(),
+            field_manager=_field_manager,
+            force=True,
+            _content_type=_apply_content_type,
+        )
+        self.log.info('Applied %s/%s', kind, name)
+        return applied.metadata.uid
+
+    async def _wait_for_reflected(self, kind, full_name, timeout=10):
+        reflector = self._route_ops[kind][2]
+        try:
+            await reflector.wait_for(full_name, timeout=timeout)
+        except asyncio.TimeoutError:
+            name = full_name.split('/', 1)[1]
+            raise asyncio.TimeoutError(
+                f'Could not find {kind}/{name} after creating it'
+            ) from None
+
+    async def _ensure_reflected(self, kind, body, full_name):
+        await self._ensure_object(kind, body)
+        await self._wait_for_reflected(kind, full_name)
+
+    @_await_reflectors_ready
     async def add_route(self, routespec, target, data):
         # Create a route with the name being escaped routespec
         # Use full routespec in label
@@ -432,25 +708,24 @@ class KubeIngressProxy(Proxy):
         safe_name = self._safe_name_for_routespec(routespec).lower()
         full_name = f'{self.namespace}/{safe_name}'
 
-        common_labels = self._expand_all(self.common_labels, routespec, data)
-        common_labels.update(
-            {
-                'app.kubernetes.io/component': self.component_label,
-                'component': self.component_label,
-            }
+        # escaping the values and reading the hub namespace is done once per
+        # route rather than for each expanded template string
+        template_values = self._template_values(routespec, data)
+
+        common_labels = self._expand_all(
+            self._prerendered('common_labels'), template_values
         )
+        common_labels.update(self._component_labels)
 
         ingress_extra_labels = self._expand_all(
-            self.ingress_extra_labels, routespec, data
+            self._prerendered('ingress_extra_labels'), template_values
         )
         ingress_extra_annotations = self._expand_all(
-            self.ingress_extra_annotations, routespec, data
+            self._prerendered('ingress_extra_annotations'), template_values
         )
 
         ingress_specifications = self._expand_all(
-            self.ingress_specifications,
-            routespec,
-            data,
+            self._prerendered('ingress_specifications'), template_values
         )
 
         endpoint, service, ingress = make_ingress(
@@ -467,133 +742,164 @@ class KubeIngressProxy(Proxy):
             reuse_existing_services=self.reuse_existing_services,
         )
 
-        async def ensure_object(create_func, patch_func, body, kind):
-            try:
-                await create_func(namespace=self.namespace, body=body)
-                self.log.info('Created %s/%s', kind, safe_name)
-            except client.rest.ApiException as e:
-                if e.status == 409:
-                    # This object already exists, we should patch it to make it be what we want
-                    self.log.warn(
-                        "Trying to patch %s/%s, it already exists", kind, safe_name
-                    )
-                    await patch_func(
-                        namespace=self.namespace,
-                        body=body,
-                        name=body.metadata.name,
-                    )
-                else:
-                    raise
-
-        if endpoint is not None:
-            await ensure_object(
-                self.core_api.create_namespaced_endpoints,
-                self.core_api.patch_namespaced_endpoints,
-                body=endpoint,
-                kind='endpoints',
+        # The ingress is created first so the service and endpoints can be
+        # owned by it, which lets delete_route leave deleting them to the
+        # garbage collector of the k8s api-server. The remaining requests and
+        # waits don't depend on each other and are made concurrently.
+        #
+        # The ingress is always applied, even if reflected as up-to-date, as the
+        # reflector may not yet have seen it being deleted, for example by a
+        # delete_route for the same routespec just before. The uid returned by
+        # the apply is then the one of the ingress that exists, and the service
+        # and endpoints are only skipped if they are reflected as owned by it.
+        ingress_uid = await self._ensure_object(
+            'ingress', ingress, skip_up_to_date=False
+        )
+        owner_references = [
+            client.V1OwnerReference(
+                api_version='networking.k8s.io/v1',
+                kind='Ingress',
+                name=safe_name,
+                uid=ingress_uid,
             )
+        ]
+        steps = [self._wait_for_reflected('ingress', full_name)]
 
-            await exponential_backoff(
-                lambda: full_name in self.endpoint_reflector.endpoints,
-                'Could not find endpoints/%s after creating it' % safe_name,
-            )
-        else:
+        # Leftover endpoints or services from a previous target of this route
+        # are deleted. The reflectors watch them, so we only ask the api-server
+        # to delete those that are known to exist, rather than making a request
+        # that will typically fail with a 404.
+        if endpoint is not None:
+            endpoint.metadata.owner_references = owner_references
+            steps.append(self._ensure_reflected('endpoints', endpoint, full_name))
+        elif full_name in self.endpoint_reflector.resources:
             delete_endpoint = self.core_api.delete_namespaced_endpoints(
                 name=safe_name,
                 namespace=self.namespace,
-                body=client.V1DeleteOptions(grace_period_seconds=0),
+                body=self._delete_options,
             )
-            await self._delete_if_exists('endpoint', safe_name, delete_endpoint)
+            steps.append(self._delete_if_exists('endpoint', safe_name, delete_endpoint))
 
         if service is not None:
-            await ensure_object(
-                self.core_api.create_namespaced_service,
-                self.core_api.patch_namespaced_service,
-                body=service,
-                kind='service',
-            )
-            await exponential_backoff(
-                lambda: full_name in self.service_reflector.services,
-                'Could not find services/%s after creating it' % safe_name,
-            )
-        else:
+            service.metadata.owner_references = owner_references
+            steps.append(self._ensure_reflected('service', service, full_name))
+        elif full_name in self.service_reflector.resources:
             delete_service = self.core_api.delete_namespaced_service(
                 name=safe_name,
                 namespace=self.namespace,
-                body=client.V1DeleteOptions(grace_period_seconds=0),
+                body=self._delete_options,
             )
-            await self._delete_if_exists('service', safe_name, delete_service)
+            steps.append(self._delete_if_exists('service', safe_name, delete_service))
 
-        await ensure_object(
-            self.networking_api.create_namespaced_ingress,
-            self.networking_api.patch_namespaced_ingress,
-            body=ingress,
-            kind='ingress',
-        )
+        await asyncio.gather(*steps)
 
-        await exponential_backoff(
-            lambda: full_name in self.ingress_reflector.ingresses,
-            'Could not find ingress/%s after creating it' % safe_name,
-        )
+    async def add_routes(self, routes, concurrency=32):
+        """
+        Add many routes concurrently, such as when reconciling all routes
+        after a restart of the hub.
 
+        routes is an iterable of (routespec, target, data) tuples as passed to
+        add_route, and at most concurrency of them are added at the same time
+        to limit the load on the k8s api-server.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def add_route(routespec, target, data):
+            async with semaphore:
+                await self.add_route(routespec, target, data)
+
+        await asyncio.gather(*(add_route(*route) for route in routes))
+
+    @_await_reflectors_ready
     async def delete_route(self, routespec):
         # We just ensure that these objects are deleted.
         # This means if some of them are already deleted, we just let it
         # be.
 
         safe_name = self._safe_name_for_routespec(routespec).lower()
+        full_name = f'{self.namespace}/{safe_name}'
 
-        delete_options = client.V1DeleteOptions(grace_period_seconds=0)
-
-        delete_endpoint = self.core_api.delete_namespaced_endpoints(
-            name=safe_name,
-            namespace=self.namespace,
-            body=delete_options,
-        )
-
-        delete_service = self.core_api.delete_namespaced_service(
-            name=safe_name,
-            namespace=self.namespace,
-            body=delete_options,
-        )
-
-        delete_ingress = self.networking_api.delete_namespaced_ingress(
-            name=safe_name,
-            namespace=self.namespace,
-            body=delete_options,
-            grace_period_seconds=0,
-        )
+        # The service and endpoints created by add_route are owned by the
+        # ingress, so deleting the ingress makes the garbage collector of the
+        # k8s api-server delete them as well, see self._delete_options.
+        deletions = [
+            self._delete_if_exists(
+                'ingress',
+                safe_name,
+                self.networking_api.delete_namespaced_ingress(
+                    name=safe_name,
+                    namespace=self.namespace,
+                    body=self._delete_options,
+                    grace_period_seconds=0,
+                ),
+            )
+        ]
+
+        # Objects created before ownerReferences were set, or by add_route
+        # calls that failed before setting them, still have to be deleted
+        # explicitly. The delete_namespaced_* calls only create coroutines, so
+        # the requests are made concurrently by the gather below.
+        for kind, reflector, delete_func in (
+            (
+                'service',
+                self.service_reflector,
+                self.core_api.delete_namespaced_service,
+            ),
+            (
+                'endpoint',
+                self.endpoint_reflector,
+                self.core_api.delete_namespaced_endpoints,
+            ),
+        ):
+            resource = reflector.resources.get(full_name)
+            if resource is None or resource['metadata'].get('ownerReferences'):
+                continue
+            deletions.append(
+                self._delete_if_exists(
+                    kind,
+                    safe_name,
+                    delete_func(
+                        name=safe_name,
+                        namespace=self.namespace,
+                        body=self._delete_options,
+                    ),
+                )
+            )
 
-        # This seems like cleanest way to parallelize all three of these while
-        # also making sure we only ignore the exception when it's a 404.
-        # The order matters for endpoint & service - deleting the service deletes
-        # the endpoint in the background. This can be racy however, so we do so
-        # explicitly ourselves as well. In the future, we can probably try a
-        # foreground cascading deletion (https://kubernetes.io/docs/concepts/workloads/controllers/garbage-collection/#foreground-cascading-deletion)
-        # instead, but for now this works well enough.
-        await asyncio.gather(
-            self._delete_if_exists('endpoint', safe_name, delete_endpoint),
-            self._delete_if_exists('service', safe_name, delete_service),
-            self._delete_if_exists('ingress', safe_name, delete_ingress),
-        )
+        await asyncio.gather(*deletions)
 
+    @_await_reflectors_ready
     async def get_all_routes(self):
-        if not self.ingress_reflector.first_load_future.done():
-            await self.ingress_reflector.first_load_future
-
-        routes = {
-            ingress["metadata"]["annotations"]['hub.jupyter.org/proxy-routespec']: {
-                'routespec': ingress["metadata"]["annotations"][
-                    'hub.jupyter.org/proxy-routespec'
-                ],
-                'target': ingress["metadata"]["annotations"][
-                    'hub.jupyter.org/proxy-target'
-                ],
-                'data': json.loads(
-                    ingress["metadata"]["annotations"]['hub.jupyter.org/proxy-data']
-                ),
-            }
-            for ingress in self.ingress_reflector.ingresses.values()
-        }
-
-        return routes
+        # Decoding the proxy-data annotation of every ingress on every call is
+        # costly for hubs with many routes, so parsed routes are cached per
+        # ingress and only re-parsed when the ingress' resourceVersion changes.
+        # Ingresses no longer reflected are dropped from the cache. If no
+        # ingress changed at all since the previous call, its result is reused.
+        # Callers get copies of the cached route dicts, so modifying them can't
+        # affect the result of later calls. The decoded data isn't copied, it
+        # must not be modified.
+        generation = self.ingress_reflector.generation
+        if generation == self._routes_generation:
+            return {k: dict(v) for k, v in self._routes.items()}
+
+        routes = {}
+        route_cache = {}
+        for key, ingress in self.ingress_reflector.ingresses.items():
+            resource_version = ingress["metadata"]["resourceVersion"]
+            cached = self._route_cache.get(key)
+            if cached is not None and cached[0] == resource_version:
+                route = cached[1]
+            else:
+                annotations = ingress["metadata"]["annotations"]
+                route = {
+                    'routespec': annotations[_routespec_annotation],
+                    'target': annotations[_target_annotation],
+                    'data': json_loads(annotations[_data_annotation]),
+                }
+            route_cache[key] = (resource_version, route)
+            routes[route['routespec']] = route
+        self._route_cache = route_cache
+        self._routes = routes
+        self._routes_generation = generation
+
+        return {k: dict(v) for k, v in routes.items()}
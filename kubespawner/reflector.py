@@ -1,7 +1,6 @@
 # specifically use concurrent.futures for threadsafety
 # asyncio Futures cannot be used across threads
 import asyncio
-import json
 import time
 from functools import partial
 
@@ -11,6 +10,10 @@ from traitlets.config import LoggingConfigurable
 from urllib3.exceptions import ReadTimeoutError
 
 from .clients import shared_client
+from .utils import json_loads
+
+# characters with a meaning in label selectors
+_label_selector_special_chars = frozenset(',=!() \t\n')
 
 # This is kubernetes client implementation specific, but we need to know
 # whether it was a network or watch timeout.
@@ -157,6 +160,20 @@ class ResourceReflector(LoggingConfigurable):
         """,
     )
 
+    list_from_cache = Bool(
+        True,
+        config=True,
+        help="""
+        Serve the lists of resources made on start and on every watch restart
+        from the api-server's watch cache.
+
+        The api-server then answers with data at least as recent as the
+        reflector has already seen, without a quorum read from etcd. Set this
+        to False to always list the most recent data from etcd, at the cost of
+        more load on etcd and the api-server.
+        """,
+    )
+
     on_failure = Any(help="""Function to be called when the reflector gives up.""")
 
     _stopping = Bool(False)
@@ -169,12 +186,30 @@ class ResourceReflector(LoggingConfigurable):
         # initialization steps.
         self.api = shared_client(self.api_group_name)
 
-        # FIXME: Protect against malicious labels?
+        # Label selectors have no escaping, so labels containing characters
+        # with a meaning in selectors would silently select something else,
+        # or make every list and watch fail. Such labels aren't valid k8s
+        # labels anyway, so they are rejected up front.
+        for key, value in self.labels.items():
+            if _label_selector_special_chars.intersection(f'{key}{value}'):
+                raise ValueError(
+                    f"Invalid label {key}={value} for {self.kind} reflector, "
+                    "label keys and values can't contain whitespace or any of "
+                    "',=!()'"
+                )
         self.label_selector = ','.join([f'{k}={v}' for k, v in self.labels.items()])
         self.field_selector = ','.join([f'{k}={v}' for k, v in self.fields.items()])
 
         self.first_load_future = asyncio.Future()
 
+        # resource keys to futures awaited in wait_for, resolved as soon as a
+        # resource with that key is reflected
+        self._waiters = {}
+
+        # incremented whenever self.resources changes, so users of the
+        # reflector can tell whether anything changed since they last looked
+        self.generation = 0
+
         # Make sure that we know kind, whether we should omit the
         #  namespace, and what our list_method_name is.  For the things
         #  we already know about, we can derive list_method_name from
@@ -245,11 +280,19 @@ class ResourceReflector(LoggingConfigurable):
             raise
 
         # This is an atomic operation on the dictionary!
-        initial_resources = json.loads(await initial_resources_raw.read())
+        initial_resources = json_loads(await initial_resources_raw.read())
+        for p in initial_resources["items"]:
+            # managedFields is bookkeeping of server-side apply that no
+            # consumer of the reflected resources reads, and typically the
+            # largest part of the metadata, so it isn't kept in memory
+            p["metadata"].pop("managedFields", None)
         self.resources = {
             f'{p["metadata"]["namespace"]}/{p["metadata"]["name"]}': p
             for p in initial_resources["items"]
         }
+        self.generation += 1
+        for key in self._waiters.keys() & self.resources.keys():
+            self._resolve_waiters(key)
         if not self.first_load_future.done():
             # signal that we've loaded our initial data at least once
             self.first_load_future.set_result(None)
@@ -305,12 +348,17 @@ class ResourceReflector(LoggingConfigurable):
             start = time.monotonic()
             w = watch.Watch()
             try:
-                resource_version = await self._list_and_update(resource_version)
+                resource_version = await self._list_and_update(
+                    resource_version if self.list_from_cache else None
+                )
                 cur_delay = 0.1
                 watch_args = {
                     "label_selector": self.label_selector,
                     "field_selector": self.field_selector,
                     "resource_version": resource_version,
+                    # ask for periodic BOOKMARK events, keeping resource_version
+                    # recent even when no watched resource changes
+                    "allow_watch_bookmarks": True,
                 }
                 if not self.omit_namespace:
                     watch_args["namespace"] = self.namespace
@@ -339,17 +387,29 @@ class ResourceReflector(LoggingConfigurable):
                         # ref: https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.28/#event-v1-core
                         cur_delay = 0.1
                         resource = watch_event['raw_object']
-                        ref_key = "{}/{}".format(
-                            resource["metadata"]["namespace"],
-                            resource["metadata"]["name"],
-                        )
-                        if watch_event['type'] == 'DELETED':
-                            # This is an atomic delete operation on the dictionary!
-                            self.resources.pop(ref_key, None)
-                        else:
-                            # This is an atomic operation on the dictionary!
-                            self.resources[ref_key] = resource
+                        if watch_event['type'] == 'BOOKMARK':
+                            # bookmarks only carry a resourceVersion, letting
+                            # the next list or watch resume from a recent one
                             resource_version = resource["metadata"]["resourceVersion"]
+                        else:
+                            ref_key = "{}/{}".format(
+                                resource["metadata"]["namespace"],
+                                resource["metadata"]["name"],
+                            )
+                            if watch_event['type'] == 'DELETED':
+                                # This is an atomic delete operation on the dictionary!
+                                self.resources.pop(ref_key, None)
+                            else:
+                                # see _list_and_update
+                                resource["metadata"].pop("managedFields", None)
+                                # This is an atomic operation on the dictionary!
+                                self.resources[ref_key] = resource
+                                resource_version = resource["metadata"][
+                                    "resourceVersion"
+                                ]
+                                if ref_key in self._waiters:
+                                    self._resolve_waiters(ref_key)
+                            self.generation += 1
                         if self._stopping:
                             self.log.info("%s watcher stopped: inner", self.kind)
                             break
@@ -396,6 +456,34 @@ class ResourceReflector(LoggingConfigurable):
                     break
         self.log.warning("%s watcher finished", self.kind)
 
+    def _resolve_waiters(self, key):
+        for future in self._waiters.pop(key, ()):
+            if not future.done():
+                future.set_result(None)
+
+    async def wait_for(self, key, timeout=None):
+        """
+        Wait for a resource with the given key (namespace/name) to be reflected.
+
+        Returns as soon as the resource has been received from the api-server,
+        rather than on the next tick of a polling loop. Raises
+        asyncio.TimeoutError if it hasn't been reflected within timeout seconds.
+        """
+        if key in self.resources:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        finally:
+            # cleanup after timeout or cancellation, when the future hasn't
+            # been popped by _resolve_waiters
+            waiters = self._waiters.get(key)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[key]
+
     async def start(self):
         """
         Start the reflection process!
@@ -409,7 +497,11 @@ class ResourceReflector(LoggingConfigurable):
         if self.watch_task and not self.watch_task.done():
             raise RuntimeError(f"Task watching for {self.kind} is already running")
         try:
-            await self._list_and_update()
+            # fetch Any (=api-server cached) data from apiserver on initial
+            # fetch, avoiding a quorum read from etcd, unless configured not to
+            await self._list_and_update(
+                resource_version="0" if self.list_from_cache else None
+            )
         except Exception as e:
             self.log.exception(f"Initial list of {self.kind} failed")
             if not self.first_load_future.done():
@@ -5,6 +5,15 @@ Misc. general utility functions, not tied to KubeSpawner directly
 import copy
 import hashlib
 
+try:
+    # orjson is optional, installed with the orjson extra, it decodes JSON
+    # considerably faster than the json module from the standard library, which
+    # matters for the full lists of resources read by the reflectors and the
+    # proxy-data annotations read by KubeIngressProxy
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 
 def generate_hashed_slug(slug, limit=63, hash_length=6):
     """
@@ -225,6 +234,29 @@ def recursive_update(target, new):
             target[k] = v
 
 
+def is_subset(subset, superset):
+    """
+    Recursively check if all values in subset are also found in superset.
+
+    Dictionaries in superset can have additional keys, while lists must be of
+    the same length and are compared item by item. This can be used to check
+    if a resource returned by the k8s api-server, with fields defaulted or set
+    by the api-server, already matches a desired resource.
+    """
+    if isinstance(subset, dict):
+        return isinstance(superset, dict) and all(
+            k in superset and is_subset(v, superset[k]) for k, v in subset.items()
+        )
+    elif isinstance(subset, list):
+        return (
+            isinstance(superset, list)
+            and len(subset) == len(superset)
+            and all(is_subset(a, b) for a, b in zip(subset, superset))
+        )
+    else:
+        return subset == superset
+
+
 class IgnoreMissing(dict):
     """
     Dictionary subclass for use with format_map
@@ -0,0 +1,435 @@
+import asyncio
+import json
+
+import escapism
+import pytest
+import pytest_asyncio
+from kubernetes_asyncio import client
+from kubernetes_asyncio.client.rest import ApiException
+
+from kubespawner.clients import shared_client
+from kubespawner.objects import make_ingress
+from kubespawner.proxy import (
+    KubeIngressProxy,
+    _escape_routespec,
+    _routespec_safe_chars,
+    _safe_name_for_routespec,
+)
+from kubespawner.slugs import is_valid_object_name
+
+
+@pytest.mark.parametrize(
+    "routespec, expected",
+    [
+        ("/", "jupyter--2F-route"),
+        ("/user/alice/", "jupyter--2Fuser-2Falice-2F-route"),
+        ("/user/Alice/", "jupyter--2Fuser-2F-41lice-2F-route"),
+        (
+            "/user/" + "a" * 80 + "/",
+            "jupyter--2fuser-2faaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa-8215a1",
+        ),
+    ],
+)
+def test_safe_name_for_routespec(routespec, expected):
+    safe_name = _safe_name_for_routespec(routespec)
+    assert safe_name == expected
+    # escapism escapes using uppercase hex, so the name must be lowercased
+    # before being used as a k8s object name
+    assert is_valid_object_name(safe_name.lower())
+
+
+@pytest.mark.parametrize(
+    "routespec",
+    [
+        "/",
+        "/user/alice/",
+        "/user/Alice/my-server/",
+        "https://alice.example.com/user/alice/",
+        "/user/tab\there/",
+        "/user/ålice/😀/",
+        "",
+    ],
+)
+def test_escape_routespec(routespec):
+    assert _escape_routespec(routespec) == escapism.escape(
+        routespec, safe=_routespec_safe_chars, escape_char='-'
+    )
+
+
+@pytest.fixture
+def bare_proxy():
+    # a proxy that isn't initialized, to test methods that don't need a k8s
+    # cluster, with the attributes they use set by the tests
+    proxy = KubeIngressProxy.__new__(KubeIngressProxy)
+    proxy._hub_namespace = 'hubns'
+    return proxy
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "",
+        "plain",
+        "{hubnamespace}",
+        "{username}-{hubnamespace}-{servername}",
+        "{{{hubnamespace}}}",
+        "{{hubnamespace}}",
+        "{{{username}}}",
+        "x{{",
+        "{hubnamespace!r}",
+        "{hubnamespace:>12}",
+        "{username!s:<8}.{hubnamespace}",
+    ],
+)
+def test_prerender(bare_proxy, template):
+    values = dict(username='alice', servername='', hubnamespace='hubns')
+    prerendered = bare_proxy._prerender(template)
+    assert bare_proxy._expand_user_properties(
+        prerendered, values
+    ) == template.format_map(values).rstrip('-')
+
+
+@pytest.mark.parametrize(
+    "template",
+    ["a}", "{hubnamespace", "{unknown}-{hubnamespace}"],
+)
+def test_prerender_invalid(bare_proxy, template):
+    values = dict(hubnamespace='hubns')
+    with pytest.raises((KeyError, ValueError)):
+        template.format_map(values)
+    prerendered = bare_proxy._prerender(template)
+    with pytest.raises((KeyError, ValueError)):
+        bare_proxy._expand_user_properties(prerendered, values)
+
+
+def _api_server_service(service, spec):
+    """
+    Returns service as returned by the api-server, with the metadata it adds
+    and the given spec, with fields set to an empty string omitted.
+    """
+    labels = service.metadata.labels
+    annotations = service.metadata.annotations
+    return {
+        'metadata': {
+            'name': service.metadata.name,
+            'namespace': 'test',
+            'uid': '7a4f0a4c-3d0e-4d43-9a0a-2d7f1c6e2b1a',
+            'resourceVersion': '1234',
+            'creationTimestamp': '2024-01-01T00:00:00Z',
+            'labels': dict(labels),
+            'annotations': dict(annotations),
+        },
+        'spec': spec,
+        'status': {'loadBalancer': {}},
+    }
+
+
+@pytest.mark.parametrize(
+    "target, spec",
+    [
+        (
+            "http://10.0.0.1:8888",
+            {
+                'type': 'ClusterIP',
+                'clusterIP': '10.43.12.34',
+                'clusterIPs': ['10.43.12.34'],
+                'ports': [{'port': 8888, 'targetPort': 8888, 'protocol': 'TCP'}],
+                'sessionAffinity': 'None',
+                'ipFamilies': ['IPv4'],
+                'ipFamilyPolicy': 'SingleStack',
+                'internalTrafficPolicy': 'Cluster',
+            },
+        ),
+        (
+            "http://jupyter-alice.other-ns.svc.cluster.local:8888",
+            {
+                'type': 'ExternalName',
+                'externalName': 'jupyter-alice.other-ns.svc.cluster.local',
+                'ports': [{'port': 8888, 'targetPort': 8888, 'protocol': 'TCP'}],
+                'sessionAffinity': 'None',
+            },
+        ),
+    ],
+)
+async def test_is_up_to_date_service(bare_proxy, target, spec):
+    _, service, _ = make_ingress(
+        name='jupyter-route',
+        routespec='/user/alice/',
+        target=target,
+        data={'user': 'alice'},
+        namespace='test',
+    )
+    resource = _api_server_service(service, spec)
+    async with client.ApiClient() as api_client:
+        bare_proxy.core_api = client.CoreV1Api(api_client)
+        assert bare_proxy._is_up_to_date(resource, service)
+
+        resource['spec']['ports'][0]['targetPort'] = 9999
+        assert not bare_proxy._is_up_to_date(resource, service)
+
+
+
+class StubIngressReflector:
+    def __init__(self):
+        self.ingresses = {}
+        self.generation = 0
+
+    def set(self, routespec, target, resource_version):
+        key = f'test/{_safe_name_for_routespec(routespec).lower()}'
+        self.ingresses[key] = {
+            'metadata': {
+                'resourceVersion': resource_version,
+                'annotations': {
+                    'hub.jupyter.org/proxy-routespec': routespec,
+                    'hub.jupyter.org/proxy-target': target,
+                    'hub.jupyter.org/proxy-data': json.dumps({'target': target}),
+                },
+            },
+        }
+        self.generation += 1
+        return key
+
+
+@pytest.fixture
+def stub_reflector_proxy(bare_proxy):
+    bare_proxy.ingress_reflector = StubIngressReflector()
+    bare_proxy._reflectors_loaded = True
+    bare_proxy._route_cache = {}
+    bare_proxy._routes = {}
+    bare_proxy._routes_generation = None
+    return bare_proxy
+
+
+async def test_get_all_routes_cache(stub_reflector_proxy):
+    proxy = stub_reflector_proxy
+    reflector = proxy.ingress_reflector
+    reflector.set('/user/a/', 'http://10.0.0.1:8888', '1')
+    key_b = reflector.set('/user/b/', 'http://10.0.0.2:8888', '1')
+
+    routes = await proxy.get_all_routes()
+    assert set(routes) == {'/user/a/', '/user/b/'}
+    assert routes['/user/a/']['data'] == {'target': 'http://10.0.0.1:8888'}
+
+    # with an unchanged generation, equal but separate objects are returned
+    again = await proxy.get_all_routes()
+    assert again == routes
+    assert again is not routes
+    assert again['/user/a/'] is not routes['/user/a/']
+
+    # modifying a returned route doesn't affect later calls
+    again['/user/a/']['target'] = 'modified'
+    again.pop('/user/b/')
+    assert await proxy.get_all_routes() == routes
+
+    # only the ingress with a new resourceVersion is parsed again
+    route_a = proxy._routes['/user/a/']
+    reflector.set('/user/b/', 'http://10.0.0.3:8888', '2')
+    routes = await proxy.get_all_routes()
+    assert routes['/user/b/']['target'] == 'http://10.0.0.3:8888'
+    assert proxy._routes['/user/a/'] is route_a
+
+    # a removed ingress is dropped from the result and the cache
+    del reflector.ingresses[key_b]
+    reflector.generation += 1
+    routes = await proxy.get_all_routes()
+    assert set(routes) == {'/user/a/'}
+    assert key_b not in proxy._route_cache
+
+
+
+async def test_add_routes(bare_proxy, monkeypatch):
+    added = []
+    running = 0
+    max_running = 0
+
+    async def add_route(routespec, target, data):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        added.append((routespec, target, data))
+
+    monkeypatch.setattr(bare_proxy, 'add_route', add_route)
+    routes = [(f'/user/{i}/', f'http://10.0.0.{i}:8888', {}) for i in range(10)]
+    await bare_proxy.add_routes(routes, concurrency=3)
+    assert sorted(added) == sorted(routes)
+    assert max_running == 3
+
+
+@pytest_asyncio.fixture
+async def ingress_proxy(kube_client, kube_ns):
+    proxy = KubeIngressProxy(namespace=kube_ns)
+    yield proxy
+    for reflector in (
+        proxy.ingress_reflector,
+        proxy.service_reflector,
+        proxy.endpoint_reflector,
+    ):
+        await reflector.stop()
+
+
+async def _read_route_objects(kube_ns, safe_name):
+    """
+    Returns the ingress, service, and endpoints named safe_name, with None for
+    those that don't exist.
+    """
+    core_api = shared_client('CoreV1Api')
+    networking_api = shared_client('NetworkingV1Api')
+    objects = []
+    for read in (
+        networking_api.read_namespaced_ingress,
+        core_api.read_namespaced_service,
+        core_api.read_namespaced_endpoints,
+    ):
+        try:
+            objects.append(await read(name=safe_name, namespace=kube_ns))
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            objects.append(None)
+    return objects
+
+
+async def _wait_for_route_objects_deleted(kube_ns, safe_name, timeout=30):
+    """
+    Waits for the ingress, service, and endpoints named safe_name to be deleted,
+    which for owned objects is done asynchronously by the garbage collector.
+    """
+    for _ in range(timeout):
+        objects = await _read_route_objects(kube_ns, safe_name)
+        if objects == [None, None, None]:
+            return
+        await asyncio.sleep(1)
+    raise TimeoutError(f"Route objects {safe_name} not deleted: {objects}")
+
+
+def _owner_uids(obj):
+    return [ref.uid for ref in obj.metadata.owner_references or []]
+
+
+async def test_route_lifecycle(ingress_proxy, kube_ns):
+    routespec = '/user/lifecycle/'
+    target = 'http://10.0.0.1:8888'
+    data = {'user': 'lifecycle'}
+    safe_name = _safe_name_for_routespec(routespec).lower()
+
+    await ingress_proxy.add_route(routespec, target, data)
+    ingress, service, endpoints = await _read_route_objects(kube_ns, safe_name)
+    assert ingress is not None
+    # the service and endpoints are owned by the ingress
+    assert _owner_uids(service) == [ingress.metadata.uid]
+    assert _owner_uids(endpoints) == [ingress.metadata.uid]
+
+    routes = await ingress_proxy.get_all_routes()
+    assert routes[routespec] == {
+        'routespec': routespec,
+        'target': target,
+        'data': data,
+    }
+
+    # the garbage collector deletes the service and endpoints with the ingress
+    await ingress_proxy.delete_route(routespec)
+    ingress, _, _ = await _read_route_objects(kube_ns, safe_name)
+    assert ingress is None
+    await _wait_for_route_objects_deleted(kube_ns, safe_name)
+    assert routespec not in await ingress_proxy.get_all_routes()
+
+
+async def test_route_readd_after_delete(ingress_proxy, kube_ns):
+    routespec = '/user/readd/'
+    target = 'http://10.0.0.2:8888'
+    data = {'user': 'readd'}
+    safe_name = _safe_name_for_routespec(routespec).lower()
+
+    await ingress_proxy.add_route(routespec, target, data)
+    old_ingress, _, _ = await _read_route_objects(kube_ns, safe_name)
+
+    # re-adding the route right after deleting it, before the reflectors and
+    # the garbage collector have caught up, moves the service and endpoints
+    # over to the new ingress
+    await ingress_proxy.delete_route(routespec)
+    await ingress_proxy.add_route(routespec, target, data)
+    ingress, service, endpoints = await _read_route_objects(kube_ns, safe_name)
+    assert ingress.metadata.uid != old_ingress.metadata.uid
+    assert _owner_uids(service) == [ingress.metadata.uid]
+    assert _owner_uids(endpoints) == [ingress.metadata.uid]
+
+    # give the garbage collector time to process the deleted ingress, which
+    # must leave the objects owned by the new one be
+    await asyncio.sleep(5)
+    ingress, service, endpoints = await _read_route_objects(kube_ns, safe_name)
+    assert service is not None and endpoints is not None
+    assert _owner_uids(service) == [ingress.metadata.uid]
+    assert routespec in await ingress_proxy.get_all_routes()
+
+    await ingress_proxy.delete_route(routespec)
+    await _wait_for_route_objects_deleted(kube_ns, safe_name)
+
+
+async def test_delete_route_unowned(ingress_proxy, kube_ns):
+    routespec = '/user/unowned/'
+    safe_name = _safe_name_for_routespec(routespec).lower()
+    full_name = f'{kube_ns}/{safe_name}'
+
+    # a service created without owner references, like those created before
+    # add_route set them, is deleted explicitly by delete_route
+    _, service, ingress = make_ingress(
+        name=safe_name,
+        routespec=routespec,
+        target='http://unowned.other-ns.svc.cluster.local:8888',
+        data={},
+        namespace=kube_ns,
+        common_labels=ingress_proxy._component_labels,
+    )
+    await shared_client('NetworkingV1Api').create_namespaced_ingress(
+        namespace=kube_ns, body=ingress
+    )
+    await shared_client('CoreV1Api').create_namespaced_service(
+        namespace=kube_ns, body=service
+    )
+    # start the reflectors, and wait for the service to be reflected as only
+    # reflected services are deleted
+    await ingress_proxy.get_all_routes()
+    await ingress_proxy.service_reflector.wait_for(full_name, timeout=10)
+
+    await ingress_proxy.delete_route(routespec)
+    await _wait_for_route_objects_deleted(kube_ns, safe_name)
+
+
+async def test_add_route_over_created_objects(ingress_proxy, kube_ns):
+    routespec = '/user/upgrade/'
+    safe_name = _safe_name_for_routespec(routespec).lower()
+
+    # objects created with plain creates, like before add_route used
+    # server-side applies, are taken over by the applies of add_route
+    endpoints, service, ingress = make_ingress(
+        name=safe_name,
+        routespec=routespec,
+        target='http://10.0.0.3:8888',
+        data={'user': 'upgrade'},
+        namespace=kube_ns,
+        common_labels=ingress_proxy._component_labels,
+    )
+    core_api = shared_client('CoreV1Api')
+    await shared_client('NetworkingV1Api').create_namespaced_ingress(
+        namespace=kube_ns, body=ingress
+    )
+    await core_api.create_namespaced_service(namespace=kube_ns, body=service)
+    await core_api.create_namespaced_endpoints(namespace=kube_ns, body=endpoints)
+
+    target = 'http://10.0.0.4:8888'
+    await ingress_proxy.add_route(routespec, target, {'user': 'upgrade'})
+    ingress, service, endpoints = await _read_route_objects(kube_ns, safe_name)
+    assert ingress.metadata.annotations['hub.jupyter.org/proxy-target'] == target
+    assert [port.port for port in service.spec.ports] == [8888]
+    assert endpoints.subsets[0].addresses[0].ip == '10.0.0.4'
+    assert _owner_uids(service) == [ingress.metadata.uid]
+    assert _owner_uids(endpoints) == [ingress.metadata.uid]
+    assert 'kubespawner' in {f.manager for f in ingress.metadata.managed_fields}
+
+    routes = await ingress_proxy.get_all_routes()
+    assert routes[routespec]['target'] == target
+
+    await ingress_proxy.delete_route(routespec)
+    await _wait_for_route_objects_deleted(kube_ns, safe_name)
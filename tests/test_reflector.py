@@ -0,0 +1,235 @@
+import asyncio
+import json
+
+import pytest
+
+from kubespawner import reflector
+from kubespawner.reflector import ResourceReflector
+
+
+class MockReflector(ResourceReflector):
+    kind = 'pods'
+    list_method_name = 'list_namespaced_pod'
+
+
+@pytest.fixture
+def mock_shared_client(monkeypatch):
+    # the reflector only uses its api client when listing and watching, for
+    # which tests set a fake one, so no connection to a k8s cluster is needed
+    monkeypatch.setattr(reflector, 'shared_client', lambda api_group_name: None)
+
+
+async def test_wait_for_reflected(mock_shared_client):
+    r = MockReflector(namespace='test')
+    r.resources = {'test/pod': {}}
+    # returns immediately if the resource is already reflected
+    await asyncio.wait_for(r.wait_for('test/pod'), timeout=1)
+    assert r._waiters == {}
+
+
+async def test_wait_for_resolved(mock_shared_client):
+    r = MockReflector(namespace='test')
+    waiters = [asyncio.ensure_future(r.wait_for('test/pod')) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert len(r._waiters['test/pod']) == 2
+    assert not any(w.done() for w in waiters)
+
+    r.resources = {'test/pod': {}}
+    r._resolve_waiters('test/pod')
+    await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+    assert r._waiters == {}
+
+
+async def test_wait_for_timeout(mock_shared_client):
+    r = MockReflector(namespace='test')
+    with pytest.raises(asyncio.TimeoutError):
+        await r.wait_for('test/pod', timeout=0.01)
+    # the future of the timed out waiter is removed
+    assert r._waiters == {}
+
+
+async def test_wait_for_cancelled(mock_shared_client):
+    r = MockReflector(namespace='test')
+    waiter = asyncio.ensure_future(r.wait_for('test/pod'))
+    other_waiter = asyncio.ensure_future(r.wait_for('test/pod'))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    # only the future of the cancelled waiter is removed
+    assert len(r._waiters['test/pod']) == 1
+
+    r._resolve_waiters('test/pod')
+    await asyncio.wait_for(other_waiter, timeout=1)
+    assert r._waiters == {}
+
+
+@pytest.mark.parametrize(
+    "labels",
+    [
+        {'a': 'b,c'},
+        {'a b': 'c'},
+        {'a': 'x!'},
+        {'a': 'b=c'},
+        {'a': '(b)'},
+    ],
+)
+def test_invalid_labels(mock_shared_client, labels):
+    with pytest.raises(ValueError):
+        MockReflector(namespace='test', labels=labels)
+
+
+@pytest.mark.parametrize(
+    "labels",
+    [
+        # the labels of the reflectors of KubeSpawner and KubeIngressProxy
+        {'component': 'singleuser-server'},
+        {'component': 'singleuser-server', 'hub.jupyter.org/proxy-route': 'true'},
+        {'app.kubernetes.io/component': 'my_component-1.0'},
+    ],
+)
+def test_valid_labels(mock_shared_client, labels):
+    r = MockReflector(namespace='test', labels=labels)
+    assert r.label_selector == ','.join(f'{k}={v}' for k, v in labels.items())
+
+
+def _pod(name, resource_version, managed_fields=True):
+    metadata = {
+        'namespace': 'test',
+        'name': name,
+        'resourceVersion': resource_version,
+    }
+    if managed_fields:
+        metadata['managedFields'] = [{'manager': 'kubelet'}]
+    return {'metadata': metadata}
+
+
+class MockListResponse:
+    ok = True
+    status = 200
+    reason = 'OK'
+
+    def __init__(self, items, resource_version):
+        self.body = {'metadata': {'resourceVersion': resource_version}, 'items': items}
+
+    async def read(self):
+        return json.dumps(self.body).encode()
+
+
+class MockApi:
+    """
+    Returns the given list responses in turn, and records the arguments of the
+    list requests.
+    """
+
+    def __init__(self, list_responses):
+        self.list_responses = list(list_responses)
+        self.list_calls = []
+
+    async def list_namespaced_pod(self, **kwargs):
+        self.list_calls.append(kwargs)
+        return self.list_responses.pop(0)
+
+
+class MockWatch:
+    """
+    Replaces kubernetes_asyncio.watch.Watch, with each stream yielding the
+    next list of events. The reflector is stopped after the last one.
+    """
+
+    streams = []
+    reflector = None
+    generations = []
+
+    def stream(self, method, **kwargs):
+        cls = type(self)
+        events = cls.streams.pop(0)
+        stop = not cls.streams
+
+        async def stream():
+            for event_type, obj in events:
+                cls.generations.append(cls.reflector.generation)
+                yield {'type': event_type, 'raw_object': obj}
+            cls.generations.append(cls.reflector.generation)
+            if stop:
+                cls.reflector._stopping = True
+
+        class Stream:
+            async def __aenter__(self):
+                return stream()
+
+            async def __aexit__(self, *exc_info):
+                pass
+
+        return Stream()
+
+    def stop(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+async def test_watch_and_update(mock_shared_client, monkeypatch):
+    r = MockReflector(namespace='test')
+    r.api = MockApi(
+        [
+            MockListResponse([_pod('a', '1')], '1'),
+            MockListResponse([_pod('b', '3')], '6'),
+        ]
+    )
+    MockWatch.reflector = r
+    MockWatch.generations = []
+    MockWatch.streams = [
+        [
+            ('ADDED', _pod('b', '3')),
+            ('BOOKMARK', {'kind': 'Pod', 'metadata': {'resourceVersion': '5'}}),
+        ],
+        [
+            ('DELETED', _pod('b', '7')),
+        ],
+    ]
+    monkeypatch.setattr(reflector.watch, 'Watch', MockWatch)
+
+    await asyncio.wait_for(r._watch_and_update(), timeout=5)
+
+    # the first list is from the api-server's cache, and the list after the
+    # watch restarted resumes from the resourceVersion of the bookmark
+    assert [c['resource_version'] for c in r.api.list_calls] == ['0', '5']
+    # bookmarks are not reflected as resources
+    assert r.resources == {}
+    # the generation changes with the lists, and the ADDED and DELETED events,
+    # but not with the bookmark
+    assert MockWatch.generations == [1, 2, 2, 3, 4]
+
+
+async def test_managed_fields_dropped(mock_shared_client, monkeypatch):
+    r = MockReflector(namespace='test')
+    r.api = MockApi([MockListResponse([_pod('a', '1')], '1')])
+    MockWatch.reflector = r
+    MockWatch.generations = []
+    MockWatch.streams = [
+        [
+            ('ADDED', _pod('b', '2')),
+            ('MODIFIED', _pod('a', '3')),
+        ],
+    ]
+    listed = []
+    list_and_update = r._list_and_update
+
+    async def record_list_and_update(*args):
+        resource_version = await list_and_update(*args)
+        listed.extend(r.resources.values())
+        return resource_version
+
+    monkeypatch.setattr(r, '_list_and_update', record_list_and_update)
+    monkeypatch.setattr(reflector.watch, 'Watch', MockWatch)
+
+    await asyncio.wait_for(r._watch_and_update(), timeout=5)
+
+    # managedFields are dropped from both listed and watched resources
+    assert listed == [_pod('a', '1', managed_fields=False)]
+    assert r.resources == {
+        'test/a': _pod('a', '3', managed_fields=False),
+        'test/b': _pod('b', '2', managed_fields=False),
+    }
@@ -10,7 +10,12 @@ from kubernetes_asyncio.client.models import (
     V1SecurityContext,
 )
 
-from kubespawner.utils import _get_k8s_model_attribute, get_k8s_model, update_k8s_model
+from kubespawner.utils import (
+    _get_k8s_model_attribute,
+    get_k8s_model,
+    is_subset,
+    update_k8s_model,
+)
 
 
 class MockLogger:
@@ -117,3 +122,22 @@ def test_get_k8s_model():
         'post_start': None,
         'pre_stop': {'exec': {'command': ['/bin/sh', 'test']}},
     }
+
+
+@pytest.mark.parametrize(
+    "subset, superset, expected",
+    [
+        ({}, {"a": 1}, True),
+        ({"a": 1}, {"a": 1, "b": 2}, True),
+        ({"a": 1}, {"a": 2}, False),
+        ({"a": 1}, {"b": 1}, False),
+        ({"a": {"b": 1}}, {"a": {"b": 1, "c": 2}}, True),
+        ({"a": {"b": 1}}, {"a": None}, False),
+        ({"a": [{"b": 1}]}, {"a": [{"b": 1, "c": 2}]}, True),
+        ({"a": [{"b": 1}]}, {"a": [{"b": 1}, {"b": 2}]}, False),
+        ({"a": []}, {"a": [1]}, False),
+        ({"a": ""}, {}, False),
+    ],
+)
+def test_is_subset(subset, superset, expected):
+    assert is_subset(subset, superset) == expected